@@ -13,20 +13,35 @@ HOW pydantic-settings WORKS:
      startup — you find out immediately, not buried inside a 500 error
 
 DEPENDENCY INJECTION PATTERN:
-  FastAPI's Depends() lets you inject get_settings() into any endpoint.
-  That means you can swap out settings in tests without monkey-patching.
+  main.py's lifespan builds exactly one Settings object at startup and
+  stores it on app.state.settings. get_settings() just hands that object
+  to any endpoint that asks for it — no cache lookup, no re-validation.
+  That means you can swap out settings in tests without monkey-patching:
+      app.dependency_overrides[get_settings] = lambda: Settings(...)
 
   Example endpoint usage:
       @router.post("/query")
-      async def query(settings: Settings = Depends(get_settings)):
-          client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+      async def query(settings: SettingsDep):
+          model = settings.ai_model
+
+  SettingsDep is Annotated[Settings, Depends(get_settings)] — the same
+  injection, declared once instead of repeated on every signature.
 """
 
-from functools import lru_cache
 from pathlib import Path
+from typing import Annotated, Literal
 
+from fastapi import Depends, Request
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+# How services/llm_cache.py treats stored Claude answers:
+#   enabled    read hits, store misses (default)
+#   read_only  read hits, never store
+#   refresh    always call Claude, overwrite the stored answer
+#   replay     serve from cache only — a miss is an error, never calls Claude
+#   disabled   bypass the cache entirely
+CacheMode = Literal["enabled", "read_only", "refresh", "replay", "disabled"]
+
 
 class Settings(BaseSettings):
     # ------------------------------------------------------------------ #
@@ -45,7 +60,20 @@ class Settings(BaseSettings):
     # AI model
     # ------------------------------------------------------------------ #
     ai_model: str = "claude-sonnet-4-5-20250929"
+    # Answers lookup-style questions (see ai_service.classify_question).
+    ai_model_simple: str = "claude-haiku-4-5-20251001"
     ai_max_tokens: int = 1024
+    anthropic_cache_mode: CacheMode = "enabled"  # env: ANTHROPIC_CACHE_MODE
+    # Upper bound on Claude calls in flight at once; extra queries wait their
+    # turn instead of piling onto the API and tripping its rate limits.
+    ai_max_concurrent_requests: int = 4
+    # Retries the Anthropic client makes on connection errors, 429s and 5xx,
+    # with exponential backoff, before the error reaches the router.
+    ai_max_retries: int = 2
+    # Questions arriving within this window are answered by one batched
+    # Claude call (see services/ai_service.py); 0 disables batching.
+    ai_batch_window_ms: int = 250
+    ai_batch_max_size: int = 8
 
     # ------------------------------------------------------------------ #
     # Pydantic-settings config
@@ -55,16 +83,20 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
-@lru_cache
-def get_settings() -> Settings:
+def get_settings(request: Request) -> Settings:
     """
-    Return a cached Settings instance.
+    Return the Settings instance created at startup.
 
-    lru_cache means this function only runs ONCE per process.
-    Every call after the first returns the same object — no repeated
-    disk reads or validation.
+    WHY app.state INSTEAD OF lru_cache?
+      Settings() is built once, in main.py's lifespan, so there is exactly
+      one instance per process and the startup validation error (e.g. a
+      missing ANTHROPIC_API_KEY) happens before the first request. Reading
+      it back is a plain attribute lookup on every request.
 
-    In tests, call get_settings.cache_clear() to force re-creation
-    with test environment variables.
+    In tests, override the dependency instead of clearing a cache:
+        app.dependency_overrides[get_settings] = lambda: Settings(...)
     """
-    return Settings()
+    return request.app.state.settings
+
+
+SettingsDep = Annotated[Settings, Depends(get_settings)]
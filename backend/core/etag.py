@@ -0,0 +1,48 @@
+"""
+core/etag.py - Conditional GET Helpers (ETag / If-None-Match)
+
+WHY THIS EXISTS:
+  The dashboard re-fetches /api/data, /api/charts/* and /api/data/raw, but
+  their JSON only changes when a new dataset is loaded. Each response is
+  tagged with an ETag derived from the dataset. The browser sends it back as
+  If-None-Match, and when it still matches we reply 304 Not Modified with an
+  empty body: no serialization, no payload over the wire.
+
+HOW THE TAG IS CHOSEN:
+  DatasetState.etag is the dataset's content hash in quotes. Every payload
+  these routes return is a pure function of the dataset plus the URL (which
+  already includes chart type / page), so one tag per dataset is enough.
+
+  Cache-Control: no-cache tells the browser it may keep the response but must
+  revalidate before reusing it — so a fresh upload is never hidden behind a
+  stale cached copy.
+
+USAGE IN A ROUTE:
+      if etag.matches(request, state.etag):
+          return etag.not_modified(state.etag)
+      etag.set_headers(response, state.etag)
+"""
+
+from fastapi import Request, Response
+
+
+def matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match header covers etag."""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def set_headers(response: Response, etag: str) -> None:
+    """Attach the validator headers to an outgoing 200 response."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+
+
+def not_modified(etag: str) -> Response:
+    """An empty 304 response carrying the same validator headers."""
+    response = Response(status_code=304)
+    set_headers(response, etag)
+    return response
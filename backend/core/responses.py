@@ -0,0 +1,49 @@
+"""
+core/responses.py - msgspec-Encoded JSON Responses
+
+WHY NOT JUST RETURN THE STRUCT?
+  FastAPI only knows how to serialise Pydantic models, dicts and the like —
+  it would run a msgspec.Struct through jsonable_encoder, slowly, if at all.
+  MsgspecResponse encodes the Struct itself with msgspec.json, and because
+  the route returns a Response instance FastAPI sends it untouched.
+
+KEEPING /docs ACCURATE:
+  Without response_model, the OpenAPI page would show an untyped 200.
+  struct_responses() builds the `responses=` entry from the Struct's own
+  JSON Schema, so the documented shape still tracks models/schemas.py.
+
+USAGE IN A ROUTE:
+      @router.get("/data", response_class=MsgspecResponse,
+                  responses=struct_responses(DataSummary))
+      def get_data_summary():
+          return MsgspecResponse(state.summary)
+"""
+
+from typing import Any
+
+import msgspec
+from fastapi import Response
+
+_encoder = msgspec.json.Encoder()
+
+
+class MsgspecResponse(Response):
+    """A JSON response whose content is encoded with msgspec."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return _encoder.encode(content)
+
+
+def struct_responses(struct_type: type[msgspec.Struct]) -> dict:
+    """OpenAPI `responses=` value documenting struct_type as the 200 body."""
+    _, components = msgspec.json.schema_components(
+        [struct_type], ref_template="#/components/schemas/{name}"
+    )
+    return {
+        200: {
+            "description": "Successful Response",
+            "content": {"application/json": {"schema": components[struct_type.__name__]}},
+        }
+    }
@@ -0,0 +1,69 @@
+"""
+core/upload_limit.py - Reject Oversized Uploads While They Arrive
+
+WHY A MIDDLEWARE?
+  FastAPI parses a multipart body before the route runs: by the time
+  upload_csv() sees its UploadFile, the whole request has already been read
+  and spooled (in memory, then to disk). The route's own size check is exact
+  but comes too late to stop a client that sends 1 GB.
+
+  This middleware sits in front of the upload route and counts body bytes as
+  the ASGI server hands them over:
+    - A Content-Length above the limit is refused before anything is read.
+    - Otherwise, the first chunk that pushes the running total past the
+      limit raises HTTPException(413), which aborts form parsing mid-stream.
+  Either way, at most ~limit bytes are ever buffered.
+
+THE LIMIT:
+  Settings.max_file_size_bytes plus MULTIPART_OVERHEAD_BYTES for boundaries
+  and part headers; the body is the file plus that framing. A file just under
+  the limit always passes here, and the route still enforces the exact limit
+  on the file bytes themselves.
+"""
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def too_large_detail(max_bytes: int) -> str:
+    """The 413 message shared with the upload route."""
+    return f"File too large (max {max_bytes // (1024 * 1024)} MB)"
+
+
+class UploadSizeLimitMiddleware:
+    """Enforce Settings.max_file_size_bytes on the request body of one path."""
+
+    def __init__(self, app: ASGIApp, path: str) -> None:
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = scope["app"].state.settings.max_file_size_bytes
+        limit = max_bytes + MULTIPART_OVERHEAD_BYTES
+
+        declared = Headers(scope=scope).get("content-length", "")
+        if declared.isdigit() and int(declared) > limit:
+            response = JSONResponse({"detail": too_large_detail(max_bytes)}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=too_large_detail(max_bytes))
+            return message
+
+        await self.app(scope, limited_receive, send)
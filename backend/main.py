@@ -29,15 +29,20 @@ APP LIFESPAN (startup/shutdown):
   The @asynccontextmanager pattern is FastAPI's modern way to run code
   at startup and shutdown (replaces the old @app.on_event decorators).
   We use it here to ensure the upload directory exists before the first
-  request arrives, without putting setup code in a route handler.
+  request arrives, and to build the shared Anthropic client, without
+  putting setup code in a route handler.
 """
 
+import asyncio
 from contextlib import asynccontextmanager
 
+import anthropic
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
-from core.config import get_settings
+from core.config import Settings
+from core.upload_limit import UploadSizeLimitMiddleware
 from routers import charts, data, query
 
 
@@ -47,14 +52,30 @@ async def lifespan(app: FastAPI):
     Runs once at startup (before `yield`) and once at shutdown (after `yield`).
 
     Startup is the right place to:
+      - Load and validate settings
       - Create directories
+      - Build long-lived API clients
       - Warm up database connections (Stage 2)
       - Load ML models into memory
       - Validate external service connectivity
     """
-    settings = get_settings()
+    settings = Settings()
+    app.state.settings = settings  # served to routes by core.config.get_settings
     settings.upload_dir.mkdir(parents=True, exist_ok=True)
+
+    # One client per process: it owns an httpx connection pool, so reusing it
+    # skips the TCP/TLS handshake and client setup on every query, and keeps
+    # connections alive between questions. The async client is awaited on
+    # the event loop, so a slow Claude call ties up neither the loop nor a
+    # threadpool worker.
+    app.state.anthropic_async = anthropic.AsyncAnthropic(
+        api_key=settings.anthropic_api_key,
+        max_retries=settings.ai_max_retries,
+    )
+    # Shared by every query; see services/ai_service.py.
+    app.state.anthropic_slots = asyncio.Semaphore(settings.ai_max_concurrent_requests)
     yield
+    await app.state.anthropic_async.close()
     # Shutdown logic goes here (e.g., close DB connections in Stage 2)
 
 
@@ -63,6 +84,8 @@ app = FastAPI(
     description="Sales & Marketing Analytics API powered by Claude",
     version="1.0.0",
     lifespan=lifespan,
+    # orjson's C encoder instead of the stdlib json module for every response.
+    default_response_class=ORJSONResponse,
 )
 
 # ---------------------------------------------------------------------------
@@ -73,6 +96,12 @@ app = FastAPI(
 # Browsers block cross-origin requests by default — this lifts that restriction
 # for our known frontend origin only.
 # ---------------------------------------------------------------------------
+# Caps the upload body while it streams in, before FastAPI parses the form
+# (see core/upload_limit.py). The last middleware added is the outermost, so
+# registering this one first keeps it inside CORS: its 413s still carry the
+# CORS headers the browser needs to read them.
+app.add_middleware(UploadSizeLimitMiddleware, path="/api/upload")
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],
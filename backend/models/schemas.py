@@ -1,5 +1,5 @@
 """
-models/schemas.py - Pydantic Request & Response Schemas
+models/schemas.py - Request & Response Schemas (Pydantic + msgspec)
 
 WHY A DEDICATED FILE:
   Pydantic models are the contract between your API and its callers.
@@ -20,8 +20,22 @@ FASTAPI INTEGRATION:
   - Response body: declare as response_model=
       @router.post("/query", response_model=QueryResponse)
   FastAPI serialises/deserialises automatically.
+
+WHY SOME RESPONSES ARE msgspec.Struct:
+  DataSummary, RawDataResponse and the chart responses back the GET
+  endpoints the dashboard polls. Their contents are built by our own code from the loaded
+  dataset, so there is nothing to validate — yet a Pydantic response_model
+  re-validates and re-serialises every row on every request.
+
+  A msgspec.Struct is a plain typed container: constructing one does no
+  validation, and msgspec.json encodes it several times faster than
+  Pydantic v2. Routes return these through core/responses.MsgspecResponse.
+
+  Client input (QueryRequest) and the low-traffic POST responses stay on
+  Pydantic — validating what callers send us is exactly its job.
 """
 
+import msgspec
 from pydantic import BaseModel, Field
 
 
@@ -52,7 +66,7 @@ class UploadResponse(BaseModel):
     columns: int
 
 
-class DataSummary(BaseModel):
+class DataSummary(msgspec.Struct, kw_only=True):
     """
     Response from GET /api/data and GET /api/sample.
 
@@ -70,9 +84,14 @@ class DataSummary(BaseModel):
     summary_stats: dict
 
 
-class RawDataResponse(BaseModel):
-    """Response from GET /api/data/raw"""
-    data: list[dict]
+class RawDataResponse(msgspec.Struct):
+    """
+    Response from GET /api/data/raw
+
+    data holds the page's rows already encoded as a JSON array; msgspec.Raw
+    splices those bytes into the output verbatim instead of re-encoding them.
+    """
+    data: msgspec.Raw
     total_rows: int
     page: int
     page_size: int
@@ -83,7 +102,22 @@ class RawDataResponse(BaseModel):
 # Chart endpoints
 # --------------------------------------------------------------------------- #
 
-class ChartResponse(BaseModel):
-    """Response from GET /api/charts/{chart_type}"""
+class ChartResponse(msgspec.Struct):
+    """
+    Response from GET /api/charts/{chart_type}
+
+    data is a list of row dicts by default, or {column: [values]} with
+    ?format=columns.
+    """
     chart_type: str
-    data: list[dict]
+    data: list[dict] | dict[str, list]
+
+
+class AllChartsResponse(msgspec.Struct):
+    """
+    Response from GET /api/charts/all
+
+    charts maps each chart type to the same data GET /api/charts/{type}
+    returns for it.
+    """
+    charts: dict[str, list[dict] | dict[str, list]]
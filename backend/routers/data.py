@@ -21,9 +21,9 @@ WHY SPLIT BY DOMAIN?
 
 DEPENDENCY INJECTION WITH Depends():
   FastAPI's Depends() is a first-class DI system. When you write:
-      settings: Settings = Depends(get_settings)
+      settings: SettingsDep   # = Annotated[Settings, Depends(get_settings)]
   FastAPI:
-    1. Calls get_settings() once per request (or uses cache)
+    1. Calls get_settings() once per request (it returns the startup instance)
     2. Passes the result as the `settings` argument
     3. Handles errors (e.g., missing env var) before your function runs
 
@@ -31,17 +31,38 @@ DEPENDENCY INJECTION WITH Depends():
   objects, not raw environment variables.
 """
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-
-from core.config import Settings, get_settings
+import asyncio
+import hashlib
+import tempfile
+from pathlib import Path
+
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+)
+
+from core import etag
+from core.config import SettingsDep
+from core.responses import MsgspecResponse, struct_responses
+from core.upload_limit import too_large_detail
 from models.schemas import DataSummary, RawDataResponse, UploadResponse
 from services import data_service
 
 router = APIRouter()
 
+UPLOAD_CHUNK_SIZE = 64 * 1024  # 64 KB
+MAX_PAGE_SIZE = 1000
+
 
-@router.get("/sample", response_model=DataSummary)
-def load_sample_data(settings: Settings = Depends(get_settings)):
+@router.get(
+    "/sample", response_class=MsgspecResponse, responses=struct_responses(DataSummary)
+)
+def load_sample_data(settings: SettingsDep):
     """
     Load the built-in sample sales dataset into memory.
 
@@ -50,13 +71,14 @@ def load_sample_data(settings: Settings = Depends(get_settings)):
       RESTful. GET is kept here to match the original design and because
       it's a read-only sample with no side effects on user data.
     """
-    return data_service.load_sample_data(settings.sample_data_path)
+    return MsgspecResponse(data_service.load_sample_data(settings.sample_data_path))
 
 
 @router.post("/upload", response_model=UploadResponse)
 async def upload_csv(
+    settings: SettingsDep,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    settings: Settings = Depends(get_settings),
 ):
     """
     Upload a CSV file to analyse.
@@ -64,40 +86,111 @@ async def upload_csv(
     FLOW:
       1. FastAPI receives multipart/form-data, wraps file in UploadFile
       2. We validate extension here (HTTP concern → stays in router)
-      3. Read bytes, pass to service (business concern → goes to service)
-      4. Service validates size/content and raises ValueError on failure
-      5. We convert ValueError → HTTP 400 here (HTTP concern → router)
+      3. Stream the body to a temp file in 64 KB chunks, hashing it and
+         rejecting it with 413 as soon as it passes the size limit
+         (core/upload_limit.py already capped the raw request body, so an
+         oversized upload never gets this far in full)
+      4. Pass the temp file to the service (business concern → goes to service)
+      5. Service validates content and raises ValueError on failure
+      6. We convert ValueError → HTTP 400 here (HTTP concern → router)
+      7. Saving the upload under its own name is a BackgroundTask: it runs
+         after the response is sent, so the client never waits on the disk
+
+    WHY STREAM INSTEAD OF file.read()?
+      Reading the whole upload, parsing a BytesIO copy of it, and writing it
+      back out held the file in memory up to three times over. Streaming
+      keeps at most one chunk in memory, and the parser reads straight
+      from disk.
 
     WHY async?
       file.read() is an async operation — it reads from the incoming
       HTTP stream. Using `await` frees the event loop while waiting,
       so other requests can be served concurrently.
+      The blocking parts — writing chunks to disk, parsing, building the
+      dataset state — run via asyncio.to_thread for the same reason: an
+      upload in progress never stalls the rest of the API.
     """
     if not file.filename or not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="Only CSV files are accepted")
 
-    contents = await file.read()
-
+    tmp_path, content_hash = await _stream_to_tempfile(
+        file, settings.upload_dir, settings.max_file_size_bytes
+    )
     try:
-        result = data_service.load_csv_bytes(contents, file.filename, settings.upload_dir)
+        result = await asyncio.to_thread(
+            data_service.load_csv_file, tmp_path, content_hash, file.filename
+        )
     except ValueError as e:
+        tmp_path.unlink(missing_ok=True)
         raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
 
+    background_tasks.add_task(
+        data_service.persist_upload, tmp_path, settings.upload_dir, file.filename
+    )
     return UploadResponse(**result)
 
 
-@router.get("/data", response_model=DataSummary)
-def get_data_summary():
-    """Return summary statistics for the currently loaded dataset."""
+async def _stream_to_tempfile(
+    file: UploadFile, upload_dir: Path, max_bytes: int
+) -> tuple[Path, str]:
+    """
+    Copy an upload into a temp file in upload_dir, chunk by chunk.
+
+    Returns (temp path, SHA256 hex digest of the contents).
+    Raises HTTPException(413) once more than max_bytes have been read.
+    Each disk write goes through asyncio.to_thread so it never blocks the loop.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=upload_dir, suffix=".part", delete=False) as tmp:
+        tmp_path = Path(tmp.name)
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                tmp.close()
+                tmp_path.unlink(missing_ok=True)
+                raise HTTPException(status_code=413, detail=too_large_detail(max_bytes))
+            digest.update(chunk)
+            await asyncio.to_thread(tmp.write, chunk)
+    return tmp_path, digest.hexdigest()
+
+
+@router.get(
+    "/data", response_class=MsgspecResponse, responses=struct_responses(DataSummary)
+)
+def get_data_summary(request: Request):
+    """
+    Return summary statistics for the currently loaded dataset.
+
+    The summary is a msgspec.Struct built at load time; MsgspecResponse
+    encodes it directly, with no response_model validation pass.
+
+    Answers 304 Not Modified when If-None-Match carries the current
+    dataset's ETag (see core/etag.py).
+    """
     try:
-        df = data_service.get_current_df()
+        state = data_service.get_state()
     except RuntimeError as e:
         raise HTTPException(status_code=404, detail=str(e))
-    return data_service.compute_summary(df)
 
+    if etag.matches(request, state.etag):
+        return etag.not_modified(state.etag)
+    response = MsgspecResponse(state.summary)
+    etag.set_headers(response, state.etag)
+    return response
 
-@router.get("/data/raw", response_model=RawDataResponse)
-def get_raw_data(page: int = 1, page_size: int = 50):
+
+@router.get(
+    "/data/raw", response_class=MsgspecResponse, responses=struct_responses(RawDataResponse)
+)
+def get_raw_data(
+    request: Request,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+):
     """
     Return paginated raw rows from the current dataset.
 
@@ -105,9 +198,28 @@ def get_raw_data(page: int = 1, page_size: int = 50):
       FastAPI reads page and page_size from the URL automatically:
           GET /api/data/raw?page=2&page_size=25
       No extra parsing code needed — FastAPI validates types too.
+      Query(ge=..., le=...) adds range checks: out-of-range values get a
+      422 before the handler runs. The page_size cap bounds how many rows a
+      single request can make us serialize.
+
+    WHY RETURN A RESPONSE DIRECTLY?
+      The service hands back the rows already serialized to JSON, wrapped in
+      msgspec.Raw, so MsgspecResponse splices them into the body verbatim.
+      Returning the response ourselves skips FastAPI's validation pass over
+      every row; struct_responses() keeps the shape documented in /docs.
+
+    ETag / 304 handling is the same as GET /api/data (see core/etag.py).
     """
     try:
-        result = data_service.get_raw_data(page=page, page_size=page_size)
+        state = data_service.get_state()
     except RuntimeError as e:
         raise HTTPException(status_code=404, detail=str(e))
-    return RawDataResponse(**result)
+
+    if etag.matches(request, state.etag):
+        return etag.not_modified(state.etag)
+
+    response = MsgspecResponse(
+        data_service.get_raw_data(state, page=page, page_size=page_size)
+    )
+    etag.set_headers(response, state.etag)
+    return response
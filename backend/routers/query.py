@@ -2,9 +2,11 @@
 routers/query.py - Natural Language Query Route
 
 DEPENDENCY INJECTION IN ACTION:
-  This endpoint uses two injected dependencies:
-    - settings: Settings = Depends(get_settings)   → API keys, model config
-    - (implicitly) data_service.get_current_df()   → the loaded DataFrame
+  This endpoint uses four injected dependencies:
+    - settings: SettingsDep                        → model config
+    - client: AnthropicDep                         → shared async Anthropic client
+    - slots: AISlotsDep                            → cap on concurrent Claude calls
+    - (implicitly) data_service.get_state()        → the loaded dataset
 
   Notice the route function is clean:
     1. Get data (or 404)
@@ -21,42 +23,148 @@ ERROR MAPPING PATTERN:
       Service raises         →  Router returns
       ─────────────────────────────────────────
       RuntimeError           →  HTTP 404 (no data loaded)
+      CacheMissError         →  HTTP 404 (replay mode, no recorded answer)
       AuthenticationError    →  HTTP 401 (bad API key)
       Exception              →  HTTP 500 (unexpected error)
+
+  POST /query/stream maps errors the same way as long as they happen
+  before the first chunk; later ones become an SSE "error" event.
 """
 
+import asyncio
+from collections.abc import AsyncIterator
+from typing import Annotated
+
 import anthropic
-from fastapi import APIRouter, Depends, HTTPException
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
-from core.config import Settings, get_settings
+from core.config import SettingsDep
 from models.schemas import QueryRequest, QueryResponse
-from services import ai_service, data_service
+from services import ai_service, data_service, llm_cache
 
 router = APIRouter()
 
 
+def get_anthropic_client(request: Request) -> anthropic.AsyncAnthropic:
+    """Return the process-wide async Anthropic client built in main.py's lifespan."""
+    return request.app.state.anthropic_async
+
+
+def get_ai_slots(request: Request) -> asyncio.Semaphore:
+    """Return the semaphore bounding concurrent Claude calls (main.py's lifespan)."""
+    return request.app.state.anthropic_slots
+
+
+AnthropicDep = Annotated[anthropic.AsyncAnthropic, Depends(get_anthropic_client)]
+AISlotsDep = Annotated[asyncio.Semaphore, Depends(get_ai_slots)]
+
+
 @router.post("/query", response_model=QueryResponse)
 async def query_data(
     request: QueryRequest,
-    settings: Settings = Depends(get_settings),
+    settings: SettingsDep,
+    client: AnthropicDep,
+    slots: AISlotsDep,
 ):
     """
     Answer a natural language question about the loaded dataset using Claude.
+
+    The data context was rendered at load time and the Claude call is
+    awaited, so nothing here blocks the event loop: other requests keep
+    being served while this one waits on the API.
     """
     try:
-        df = data_service.get_current_df()
+        state = data_service.get_state()
     except RuntimeError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
     try:
-        answer = ai_service.ask_claude(
+        answer = await ai_service.ask_claude(
             question=request.question,
-            df=df,
+            data_context=state.data_context,
+            data_fingerprint=state.fingerprint,
+            client=client,
+            slots=slots,
             settings=settings,
         )
+    except llm_cache.CacheMissError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except anthropic.AuthenticationError:
         raise HTTPException(status_code=401, detail="Invalid Anthropic API key")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI query failed: {e}")
 
     return QueryResponse(question=request.question, answer=answer)
+
+
+@router.post("/query/stream")
+async def query_data_stream(
+    request: QueryRequest,
+    settings: SettingsDep,
+    client: AnthropicDep,
+    slots: AISlotsDep,
+):
+    """
+    Same as POST /api/query, but stream the answer as Server-Sent Events.
+
+    The first bytes go out with Claude's first token instead of after the
+    whole answer. Each chunk is one event, and a final "done" event marks
+    the end:
+
+        data: {"delta": "Revenue peaked in "}
+
+        data: {"delta": "December 2024..."}
+
+        event: done
+        data: {}
+
+    WHY READ THE FIRST CHUNK HERE?
+      Once a StreamingResponse starts, its 200 status is already sent.
+      Pulling the first chunk before returning means "no data", replay
+      cache misses and a bad API key still map to 404/401/500 as above.
+      Failures after that arrive as an "error" event.
+    """
+    try:
+        state = data_service.get_state()
+    except RuntimeError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    chunks = ai_service.stream_claude(
+        question=request.question,
+        data_context=state.data_context,
+        data_fingerprint=state.fingerprint,
+        client=client,
+        slots=slots,
+        settings=settings,
+    )
+    try:
+        first = await anext(chunks, "")
+    except llm_cache.CacheMissError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except anthropic.AuthenticationError:
+        raise HTTPException(status_code=401, detail="Invalid Anthropic API key")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"AI query failed: {e}")
+
+    return StreamingResponse(_sse_events(first, chunks), media_type="text/event-stream")
+
+
+async def _sse_events(first: str, chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    """Frame the answer chunks as SSE messages, ending with done (or error)."""
+    if first:
+        yield _sse({"delta": first})
+    try:
+        async for text in chunks:
+            yield _sse({"delta": text})
+    except Exception as e:
+        yield _sse({"detail": f"AI query failed: {e}"}, event="error")
+        return
+    yield _sse({}, event="done")
+
+
+def _sse(payload: dict, event: str | None = None) -> bytes:
+    """One Server-Sent Events message carrying payload as JSON."""
+    prefix = f"event: {event}\n".encode() if event else b""
+    return prefix + b"data: " + orjson.dumps(payload) + b"\n\n"
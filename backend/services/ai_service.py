@@ -11,38 +11,136 @@ WHY SEPARATE FROM THE ROUTER?
   - If Anthropic adds streaming or tool use, you add it here — routers don't change.
 
 PROMPT ENGINEERING NOTE:
-  We send a system-style instruction in the user message (Claude's API doesn't
-  require a separate system turn). The data context is truncated to stay within
-  token limits — describe() + head(10) + tail(5) gives Claude enough signal
-  without sending thousands of rows.
+  The data context is truncated to stay within token limits: count/mean/
+  min/max per numeric column plus the first 10 rows (and last 5 on longer
+  frames), as CSV and capped at 20 columns, gives Claude enough signal
+  without sending thousands of rows (see data_service.build_data_context for
+  the budgets). It is built once per dataset load, so this module only
+  receives the string.
+
+PROMPT CACHING:
+  Every question against a dataset shares the same long prefix: our fixed
+  instructions plus the data context. So they go in the system prompt, and
+  the user message carries only the question. The last system block is
+  marked cache_control={"type": "ephemeral"}; Anthropic caches everything up
+  to that breakpoint, and follow-up questions read the prefix from cache —
+  far fewer billed input tokens and a faster first token. One breakpoint
+  covers both blocks; a second one on the instructions alone would sit below
+  the minimum cacheable length and never hit.
+
+  The prefix must be byte-identical between calls for a hit, which is why
+  STATIC_INSTRUCTIONS is a module constant. Prefixes shorter than the model's
+  minimum (~1024 tokens) are simply not cached. Per-call cache reads/writes
+  are logged at DEBUG level to verify that hits happen.
+
+BATCHING:
+  Dashboards fire several questions at once. The first question to miss the
+  answer cache opens a batch for its dataset, and every question that
+  arrives for that dataset within Settings.ai_batch_window_ms (250 ms)
+  joins it, up to ai_batch_max_size (8). The whole batch then goes out as one
+  call that asks for a JSON array of answers in question order. That means
+  one round-trip and one read of the cached prefix, and each caller's
+  future gets its own answer. A lone question is sent as a normal call.
+  If the reply isn't a well-formed array, the batch falls back to one call
+  per question. Set the window to 0 to disable batching. A question that
+  matches one already waiting in the batch (after llm_cache's normalization)
+  shares that answer instead of being asked twice.
+
+MODEL ROUTING:
+  Lookup-style questions ("how many rows?", "what columns are there?",
+  "what is the max revenue?") don't need a large model. classify_question()
+  spots them with a local regex and they go to Settings.ai_model_simple
+  (Haiku: cheaper and faster); everything else goes to Settings.ai_model.
+  Only short, single-clause questions qualify: "what was the total revenue
+  trend and what drove the Q3 dip?" opens like a lookup but is analysis.
+  The model is part of both the answer-cache key and the batch key, so the
+  two tiers never mix. Set ai_model_simple to ai_model to turn routing off.
+
+CONCURRENCY:
+  The call goes through anthropic.AsyncAnthropic and is awaited, so while
+  Claude thinks the event loop serves other requests. A shared
+  asyncio.Semaphore (Settings.ai_max_concurrent_requests) caps how many calls
+  are in flight; queries beyond that wait for a slot rather than bursting
+  into Anthropic's rate limits. Cache hits never take a slot.
 """
 
+import asyncio
+import json
+import logging
+import re
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Literal
+
 import anthropic
-import pandas as pd
 
 from core.config import Settings
+from services import llm_cache
 
+logger = logging.getLogger(__name__)
 
-def build_data_context(df: pd.DataFrame) -> str:
-    """
-    Produce a compact text summary of a DataFrame for use in a prompt.
+STATIC_INSTRUCTIONS = (
+    "You are a data analytics assistant for a sales & marketing analytics "
+    "platform called InsightsAI.\n"
+    "You have access to the dataset described in the next block.\n"
+    "Answer the user's question about the data concisely and insightfully. "
+    "Include specific numbers when relevant. "
+    "If the data doesn't contain enough information to answer, say so."
+)
+
+# Lookup-style questions a small model answers as well as a large one: row
+# and column counts, column listings, a single min/max/total/average.
+# Matched at the start of the normalized question; the rest of the question
+# must then pass the two checks below.
+_SIMPLE_QUESTION = re.compile(
+    r"^(how many (rows|columns|records|entries)"
+    r"|(what|which) (are the )?columns"
+    r"|(list|show) (me )?(the |all )?columns"
+    r"|what (is|was|are|were) the (min|max|minimum|maximum|lowest|highest|total|sum|average|mean) )"
+)
+
+# A lookup is a single short clause. Longer questions, or ones that go on
+# to ask for a breakdown, a comparison, a trend, a reason, a filter ("rows
+# have revenue above 40000") or a ranking over periods ("highest revenue
+# months", "top 3"), are analysis however they open.
+_SIMPLE_MAX_WORDS = 10
+_FOLLOW_ON = re.compile(
+    r"[,;]|\b(and|or|but|then|why|how|what|which|when|where"
+    r"|trend|trends|over time|compare|compared|vs|versus|by|per|each"
+    r"|change|changed|drove|driven|because"
+    r"|have|has|with|without|above|below|over|under|greater|less|more|fewer"
+    r"|than|between|top|bottom|rank|ranked"
+    r"|days|weeks|months|quarters|years)\b"
+)
+
+QuestionComplexity = Literal["simple", "standard"]
 
-    WHY NOT SEND ALL THE DATA?
-      LLMs have context limits, and sending 10,000 rows is wasteful.
-      Descriptive stats + a sample of rows gives the model enough signal
-      to answer most analytical questions accurately.
-    """
-    return (
-        f"Dataset Overview:\n"
-        f"- Rows: {len(df)}, Columns: {len(df.columns)}\n"
-        f"- Columns: {', '.join(df.columns.tolist())}\n\n"
-        f"Summary Statistics:\n{df.describe().to_string()}\n\n"
-        f"First 10 rows:\n{df.head(10).to_string()}\n\n"
-        f"Last 5 rows:\n{df.tail(5).to_string()}\n"
-    )
 
+@dataclass
+class _Batch:
+    """Questions about one dataset collected during a batch window."""
+    data_context: str
+    model: str
+    items: list[tuple[str, asyncio.Future]] = field(default_factory=list)
+    # Set once the batch reaches Settings.ai_batch_max_size.
+    full: asyncio.Event = field(default_factory=asyncio.Event)
 
-def ask_claude(question: str, df: pd.DataFrame, settings: Settings) -> str:
+
+# The batch currently collecting questions, per (fingerprint, model,
+# max_tokens). Only touched from the event loop, so no lock is needed.
+_open_batches: dict[tuple, _Batch] = {}
+# Strong references to running batch tasks; the event loop only keeps weak ones.
+_batch_tasks: set[asyncio.Task] = set()
+
+
+async def ask_claude(
+    question: str,
+    data_context: str,
+    data_fingerprint: str,
+    client: anthropic.AsyncAnthropic,
+    slots: asyncio.Semaphore,
+    settings: Settings,
+) -> str:
     """
     Send a natural-language question + data context to Claude and return the answer.
 
@@ -50,46 +148,322 @@ def ask_claude(question: str, df: pd.DataFrame, settings: Settings) -> str:
     ----------
     question : str
         The user's question, e.g. "What was the best performing month?"
-    df : pd.DataFrame
-        The current dataset to analyse.
+    data_context : str
+        Text summary of the current dataset (DatasetState.data_context).
+    data_fingerprint : str
+        Content hash of the dataset (DatasetState.fingerprint),
+        used in the response cache key.
+    client : anthropic.AsyncAnthropic
+        Shared async client built once at startup (see main.py lifespan).
+    slots : asyncio.Semaphore
+        Bounds concurrent Claude calls; held only while the request is out.
     settings : Settings
-        Injected settings — contains api_key, model name, max_tokens.
+        Injected settings — contains model name, max_tokens.
 
     Returns
     -------
     str
-        Claude's response text.
+        Claude's response text — possibly served from llm_cache.
 
     Raises
     ------
+    llm_cache.CacheMissError
+        In replay mode, when this question has no recorded answer.
     anthropic.AuthenticationError
         Re-raised so the router can map it to HTTP 401.
     Exception
         Any other Anthropic error is re-raised for the router to handle.
 
-    WHY PASS settings AS A PARAMETER?
-      Dependency injection. In tests you pass a Settings object with a fake key
-      (and mock the Anthropic client). The function itself stays pure and
-      testable without network calls.
+    WHY PASS client AND settings AS PARAMETERS?
+      Dependency injection. In tests you pass a mock client and a Settings
+      object with a fake key. The function itself stays pure and testable
+      without network calls.
     """
-    data_context = build_data_context(df)
-
-    prompt = (
-        "You are a data analytics assistant for a sales & marketing analytics "
-        "platform called InsightsAI.\n"
-        "You have access to the following dataset:\n\n"
-        f"{data_context}\n\n"
-        "Answer this question about the data concisely and insightfully. "
-        "Include specific numbers when relevant. "
-        "If the data doesn't contain enough information to answer, say so.\n\n"
-        f"Question: {question}"
+    model = select_model(question, settings)
+    key = llm_cache.make_key(question, data_fingerprint, model, settings.ai_max_tokens)
+    return await llm_cache.get_or_compute(
+        key,
+        lambda: _answer(
+            question, data_context, data_fingerprint, model, client, slots, settings
+        ),
+        mode=settings.anthropic_cache_mode,
     )
 
-    client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
-    message = client.messages.create(
-        model=settings.ai_model,
-        max_tokens=settings.ai_max_tokens,
-        messages=[{"role": "user", "content": prompt}],
+
+async def stream_claude(
+    question: str,
+    data_context: str,
+    data_fingerprint: str,
+    client: anthropic.AsyncAnthropic,
+    slots: asyncio.Semaphore,
+    settings: Settings,
+) -> AsyncIterator[str]:
+    """
+    Like ask_claude(), but yield the answer as text chunks while it is generated.
+
+    A cached answer is yielded whole, as a single chunk. Otherwise chunks
+    are yielded as Claude produces them, and the full text is stored in
+    llm_cache once the stream completes — an abandoned stream stores nothing.
+    Streamed questions are never batched: each one needs its own response.
+
+    Raises the same exceptions as ask_claude(), from the first iteration.
+    """
+    model = select_model(question, settings)
+    key = llm_cache.make_key(question, data_fingerprint, model, settings.ai_max_tokens)
+    mode = settings.anthropic_cache_mode
+
+    cached = llm_cache.lookup(key, mode)
+    if cached is not None:
+        yield cached
+        return
+
+    parts: list[str] = []
+    async with slots:
+        async with client.messages.stream(
+            model=model,
+            max_tokens=settings.ai_max_tokens,
+            system=_system_blocks(data_context),
+            messages=[{"role": "user", "content": question}],
+        ) as stream:
+            async for text in stream.text_stream:
+                parts.append(text)
+                yield text
+            message = await stream.get_final_message()
+
+    _log_usage(model, message.usage)
+    llm_cache.store(key, "".join(parts), mode)
+
+
+def classify_question(question: str) -> QuestionComplexity:
+    """
+    "simple" for short lookup-style questions, else "standard".
+
+    The question must open like a lookup (_SIMPLE_QUESTION), stay within
+    _SIMPLE_MAX_WORDS words, and not carry on past the lookup (_FOLLOW_ON).
+
+    A local regex, not a model call: classifying with Claude would cost a
+    round-trip on every question to save one on some of them.
+    """
+    normalized = llm_cache.normalize_question(question)
+    match = _SIMPLE_QUESTION.match(normalized)
+    if (
+        match is None
+        or len(normalized.split()) > _SIMPLE_MAX_WORDS
+        or _FOLLOW_ON.search(normalized, match.end())
+    ):
+        return "standard"
+    return "simple"
+
+
+def select_model(question: str, settings: Settings) -> str:
+    """The model that should answer question: ai_model_simple or ai_model."""
+    model_map: dict[QuestionComplexity, str] = {
+        "simple": settings.ai_model_simple,
+        "standard": settings.ai_model,
+    }
+    return model_map[classify_question(question)]
+
+
+async def _answer(
+    question: str,
+    data_context: str,
+    data_fingerprint: str,
+    model: str,
+    client: anthropic.AsyncAnthropic,
+    slots: asyncio.Semaphore,
+    settings: Settings,
+) -> str:
+    """Answer one question, joining an open batch for its dataset if batching is on."""
+    if settings.ai_batch_window_ms <= 0 or settings.ai_batch_max_size <= 1:
+        return await _call_claude(question, data_context, model, client, slots, settings)
+
+    key = (data_fingerprint, model, settings.ai_max_tokens)
+    batch = _open_batches.get(key)
+    if batch is None:
+        batch = _Batch(data_context=data_context, model=model)
+        _open_batches[key] = batch
+        task = asyncio.create_task(_run_batch(key, batch, client, slots, settings))
+        _batch_tasks.add(task)
+        task.add_done_callback(_batch_tasks.discard)
+
+    # Futures belong to the batch, not to whoever awaits them: every caller
+    # awaits through asyncio.shield, so a client that disconnects cancels
+    # only its own wait. Without the shield, cancelling the asker who queued
+    # a question would cancel the future every duplicate asker shares.
+
+    # The same question already waiting in this batch: share its answer.
+    normalized = llm_cache.normalize_question(question)
+    for queued, queued_future in batch.items:
+        if llm_cache.normalize_question(queued) == normalized:
+            return await asyncio.shield(queued_future)
+
+    future = asyncio.get_running_loop().create_future()
+    batch.items.append((question, future))
+    if len(batch.items) >= settings.ai_batch_max_size:
+        # Full: send now, and let the next question open a fresh batch.
+        del _open_batches[key]
+        batch.full.set()
+    return await asyncio.shield(future)
+
+
+async def _run_batch(
+    key: tuple,
+    batch: "_Batch",
+    client: anthropic.AsyncAnthropic,
+    slots: asyncio.Semaphore,
+    settings: Settings,
+) -> None:
+    """Wait out the batch window (or until the batch fills), then answer it."""
+    try:
+        try:
+            await asyncio.wait_for(batch.full.wait(), settings.ai_batch_window_ms / 1000)
+        except asyncio.TimeoutError:
+            pass
+        if _open_batches.get(key) is batch:
+            del _open_batches[key]
+
+        questions = [question for question, _ in batch.items]
+        if len(questions) == 1:
+            answers = [
+                await _call_claude(
+                    questions[0], batch.data_context, batch.model, client, slots, settings
+                )
+            ]
+        else:
+            answers = await _call_claude_batch(
+                questions, batch.data_context, batch.model, client, slots, settings
+            )
+    except asyncio.CancelledError:
+        for _, future in batch.items:
+            future.cancel()
+        raise
+    except Exception as e:
+        # Every caller in the batch sees the error, so the router maps it
+        # (401, 500, ...) exactly as it would for a lone question.
+        for _, future in batch.items:
+            if not future.done():
+                future.set_exception(e)
+        return
+
+    for (_, future), answer in zip(batch.items, answers):
+        if not future.done():  # the caller may have gone away
+            future.set_result(answer)
+
+
+async def _call_claude_batch(
+    questions: list[str],
+    data_context: str,
+    model: str,
+    client: anthropic.AsyncAnthropic,
+    slots: asyncio.Semaphore,
+    settings: Settings,
+) -> list[str]:
+    """
+    Answer several questions about one dataset with a single Claude call.
+
+    Claude is asked for a JSON array with one answer per question, in order.
+    If the reply can't be read that way, each question falls back to its
+    own call, so callers always get an answer to their own question.
+    """
+    content = (
+        f"Answer each of these {len(questions)} questions about the data. "
+        "Reply with only a JSON array of strings: one answer per question, "
+        "in the same order, each written as you would answer that question "
+        "on its own.\n\n"
+        f"{json.dumps(questions, ensure_ascii=False)}"
     )
+    text = await _create(
+        client, slots, data_context, content,
+        model=model, max_tokens=settings.ai_max_tokens * len(questions),
+    )
+
+    answers = _parse_batch_answers(text, len(questions))
+    if answers is not None:
+        return answers
 
+    logger.warning(
+        "Batched reply for %d questions was not a JSON array; retrying singly",
+        len(questions),
+    )
+    return list(
+        await asyncio.gather(
+            *(
+                _call_claude(q, data_context, model, client, slots, settings)
+                for q in questions
+            )
+        )
+    )
+
+
+def _parse_batch_answers(text: str, expected: int) -> list[str] | None:
+    """The JSON array of `expected` strings inside text, or None if there isn't one."""
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end < start:
+        return None
+    try:
+        answers = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    if (
+        not isinstance(answers, list)
+        or len(answers) != expected
+        or not all(isinstance(a, str) for a in answers)
+    ):
+        return None
+    return answers
+
+
+async def _call_claude(
+    question: str,
+    data_context: str,
+    model: str,
+    client: anthropic.AsyncAnthropic,
+    slots: asyncio.Semaphore,
+    settings: Settings,
+) -> str:
+    """Ask Claude a single question."""
+    return await _create(
+        client, slots, data_context, question,
+        model=model, max_tokens=settings.ai_max_tokens,
+    )
+
+
+async def _create(
+    client: anthropic.AsyncAnthropic,
+    slots: asyncio.Semaphore,
+    data_context: str,
+    content: str,
+    model: str,
+    max_tokens: int,
+) -> str:
+    """Build the prompt and make the actual Anthropic API call."""
+    async with slots:
+        message = await client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            system=_system_blocks(data_context),
+            messages=[{"role": "user", "content": content}],
+        )
+
+    _log_usage(model, message.usage)
     return message.content[0].text
+
+
+def _system_blocks(data_context: str) -> list[dict]:
+    """The cacheable system prompt: fixed instructions, then the dataset context."""
+    return [
+        {"type": "text", "text": STATIC_INSTRUCTIONS},
+        {"type": "text", "text": data_context, "cache_control": {"type": "ephemeral"}},
+    ]
+
+
+def _log_usage(model: str, usage: anthropic.types.Usage) -> None:
+    """Log a call's token counts, including prompt-cache reads and writes."""
+    logger.debug(
+        "Claude usage (%s): input=%s cache_read=%s cache_write=%s output=%s",
+        model,
+        usage.input_tokens,
+        usage.cache_read_input_tokens,
+        usage.cache_creation_input_tokens,
+        usage.output_tokens,
+    )
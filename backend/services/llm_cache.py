@@ -0,0 +1,108 @@
+"""
+services/llm_cache.py - Deterministic Cache for Claude Answers
+
+WHY CACHE LLM RESPONSES?
+  The same question asked twice against the same dataset produces the same
+  prompt. Sending it again costs a 1–5s network round-trip and real money for
+  an answer we already have. A cache hit returns in microseconds.
+
+THE CACHE KEY:
+  SHA256(normalize_question(question) || data_fingerprint || model || max_tokens)
+
+  Everything that changes the prompt or the model's output is in the key:
+    - question          → what the user asked, normalized so that retyping
+                          it with different case, spacing or a trailing "?"
+                          still hits
+    - data_fingerprint  → which dataset the context was built from
+                          (data_service.DatasetState.fingerprint)
+    - model, max_tokens → which model answers and how long it may be
+
+  If any of them changes, the key changes — no explicit invalidation needed.
+
+CACHE MODES (Settings.anthropic_cache_mode, env ANTHROPIC_CACHE_MODE):
+  See CacheMode in core/config.py. "replay" is useful when iterating on the
+  frontend or demoing offline: recorded answers are served, and nothing is
+  ever sent to Anthropic.
+
+STORAGE:
+  A plain in-process dict, like the dataset in data_service.py. It is lost on
+  restart and not shared between workers — fine for a single-process dev
+  server. Entries are evicted oldest-first past MAX_ENTRIES.
+"""
+
+import hashlib
+from collections.abc import Awaitable, Callable
+
+from core.config import CacheMode
+
+MAX_ENTRIES = 1024
+
+_cache: dict[str, str] = {}
+
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when no answer has been recorded for a key."""
+
+
+def normalize_question(question: str) -> str:
+    """
+    Canonical form of a question for cache lookups.
+
+    Lowercases, collapses runs of whitespace, and drops trailing sentence
+    punctuation: "Best  month?" and "best month" are the same question.
+    """
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+
+def make_key(question: str, data_fingerprint: str, model: str, max_tokens: int) -> str:
+    """Build the deterministic cache key for one Claude call."""
+    raw = "\x1f".join(
+        (normalize_question(question), data_fingerprint, model, str(max_tokens))
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def get_or_compute(
+    key: str, compute: Callable[[], Awaitable[str]], mode: CacheMode
+) -> str:
+    """
+    Return the cached answer for key, or await compute() and store the result.
+
+    How reads and writes behave depends on mode (see CacheMode).
+    Raises CacheMissError in replay mode when key has no recorded answer.
+    """
+    answer = lookup(key, mode)
+    if answer is None:
+        answer = await compute()
+        store(key, answer, mode)
+    return answer
+
+
+def lookup(key: str, mode: CacheMode) -> str | None:
+    """
+    The stored answer for key, or None if there is none (or mode skips reads).
+
+    Raises CacheMissError in replay mode when key has no recorded answer.
+    For callers that produce the answer themselves, e.g. while streaming it.
+    """
+    if mode in ("enabled", "read_only", "replay") and key in _cache:
+        return _cache[key]
+
+    if mode == "replay":
+        raise CacheMissError("No cached answer for this question (cache mode: replay)")
+
+    return None
+
+
+def store(key: str, answer: str, mode: CacheMode) -> None:
+    """Record answer under key, if mode writes to the cache."""
+    if mode in ("enabled", "refresh"):
+        _cache.pop(key, None)
+        _cache[key] = answer
+        if len(_cache) > MAX_ENTRIES:
+            del _cache[next(iter(_cache))]
+
+
+def clear() -> None:
+    """Drop every stored answer."""
+    _cache.clear()
@@ -0,0 +1,218 @@
+"""
+tests/test_ai_service.py - Request Batching and Model Routing in services/ai_service.py
+
+ask_claude() takes its client as a parameter, so these tests pass a fake
+AsyncAnthropic instead of calling the API. The fake answers a batched
+prompt with a JSON array ("answer: <question>" per question) and a single
+question with "answer: <question>", and records every call it receives.
+
+Each test runs its own event loop with asyncio.run, so no async test
+plugin is needed.
+"""
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from core.config import Settings
+from services import ai_service
+
+BATCH_PREFIX = "Answer each of these"
+
+
+class FakeMessages:
+    def __init__(self, reply: str = "json", error: Exception | None = None):
+        self.reply = reply
+        self.error = error
+        self.calls: list[dict] = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        await asyncio.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+        content = kwargs["messages"][0]["content"]
+        if content.startswith(BATCH_PREFIX):
+            questions = json.loads(content[content.index("["):])
+            if self.reply == "json":
+                text = json.dumps([f"answer: {q}" for q in questions])
+            else:
+                text = "Here are your answers, in prose."
+        else:
+            text = f"answer: {content}"
+        usage = SimpleNamespace(
+            input_tokens=0,
+            output_tokens=0,
+            cache_read_input_tokens=0,
+            cache_creation_input_tokens=0,
+        )
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], usage=usage)
+
+
+class FakeClient:
+    def __init__(self, **kwargs):
+        self.messages = FakeMessages(**kwargs)
+
+
+def _settings(**overrides) -> Settings:
+    values = {
+        "anthropic_api_key": "test-key",
+        "anthropic_cache_mode": "disabled",
+        "ai_batch_window_ms": 50,
+        "ai_batch_max_size": 8,
+    }
+    values.update(overrides)
+    return Settings(**values)
+
+
+def _ask(question: str, client: FakeClient, settings: Settings, fingerprint: str = "fp"):
+    return ai_service.ask_claude(
+        question, "ctx", fingerprint, client, asyncio.Semaphore(4), settings
+    )
+
+
+def _batched_calls(client: FakeClient) -> list[dict]:
+    return [
+        call for call in client.messages.calls
+        if call["messages"][0]["content"].startswith(BATCH_PREFIX)
+    ]
+
+
+def test_questions_in_one_window_share_one_call_and_keep_their_answers():
+    client, settings = FakeClient(), _settings()
+
+    async def main():
+        return await asyncio.gather(*(_ask(f"question {i}", client, settings) for i in range(3)))
+
+    answers = asyncio.run(main())
+
+    assert answers == ["answer: question 0", "answer: question 1", "answer: question 2"]
+    assert len(client.messages.calls) == 1
+    assert client.messages.calls[0]["max_tokens"] == settings.ai_max_tokens * 3
+
+
+def test_lone_question_is_sent_as_a_plain_call():
+    client, settings = FakeClient(), _settings()
+
+    answer = asyncio.run(_ask("question", client, settings))
+
+    assert answer == "answer: question"
+    assert _batched_calls(client) == []
+
+
+def test_full_batch_is_sent_without_waiting_out_the_window():
+    client, settings = FakeClient(), _settings(ai_batch_window_ms=5000, ai_batch_max_size=2)
+
+    async def main():
+        return await asyncio.gather(_ask("q1", client, settings), _ask("q2", client, settings))
+
+    started = time.monotonic()
+    answers = asyncio.run(main())
+
+    assert answers == ["answer: q1", "answer: q2"]
+    assert time.monotonic() - started < 1
+    assert len(client.messages.calls) == 1
+
+
+def test_batches_are_split_per_dataset():
+    client, settings = FakeClient(), _settings()
+
+    async def main():
+        return await asyncio.gather(
+            _ask("q1", client, settings, fingerprint="a"),
+            _ask("q2", client, settings, fingerprint="b"),
+        )
+
+    assert asyncio.run(main()) == ["answer: q1", "answer: q2"]
+    assert len(client.messages.calls) == 2
+    assert _batched_calls(client) == []
+
+
+def test_malformed_batch_reply_falls_back_to_one_call_per_question():
+    client, settings = FakeClient(reply="prose"), _settings()
+
+    async def main():
+        return await asyncio.gather(_ask("q1", client, settings), _ask("q2", client, settings))
+
+    answers = asyncio.run(main())
+
+    assert answers == ["answer: q1", "answer: q2"]
+    assert len(_batched_calls(client)) == 1
+    assert len(client.messages.calls) == 3
+
+
+def test_batch_error_reaches_every_caller():
+    client, settings = FakeClient(error=RuntimeError("boom")), _settings()
+
+    async def main():
+        return await asyncio.gather(
+            _ask("q1", client, settings), _ask("q2", client, settings), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+
+    assert [type(r) for r in results] == [RuntimeError, RuntimeError]
+    assert len(client.messages.calls) == 1
+
+
+def test_duplicate_question_is_asked_once():
+    client, settings = FakeClient(), _settings()
+
+    async def main():
+        return await asyncio.gather(
+            _ask("Best month?", client, settings),
+            _ask("best  month", client, settings),
+            _ask("other", client, settings),
+        )
+
+    answers = asyncio.run(main())
+
+    assert answers == ["answer: Best month?", "answer: Best month?", "answer: other"]
+    questions = json.loads(_batched_calls(client)[0]["messages"][0]["content"].split("\n\n")[-1])
+    assert questions == ["Best month?", "other"]
+
+
+def test_cancelled_first_asker_does_not_cancel_its_duplicate():
+    client, settings = FakeClient(), _settings()
+
+    async def main():
+        first = asyncio.create_task(_ask("best month", client, settings))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(_ask("Best month?", client, settings))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "answer: best month"
+
+
+# ---------------------------------------------------------------------------
+# Model routing
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("question", [
+    "How many rows?",
+    "What columns are there?",
+    "List the columns",
+    "what is the max revenue?",
+    "What was the average deal size?",
+])
+def test_lookups_are_simple(question):
+    assert ai_service.classify_question(question) == "simple"
+
+
+@pytest.mark.parametrize("question", [
+    "What was the total revenue trend and what drove the Q3 dip?",
+    "What is the total revenue by region?",
+    "what were the highest revenue months",
+    "how many rows have revenue above 40000",
+    "What is the max revenue, and when?",
+    "Why did revenue drop?",
+])
+def test_analysis_is_standard(question):
+    assert ai_service.classify_question(question) == "standard"
@@ -0,0 +1,104 @@
+"""
+tests/test_data_service.py - Parsing and Payload Checks for services/data_service.py
+
+Services take plain inputs, so these tests need no HTTP layer: a CSV is
+written to tmp_path and handed to load_csv_file(), the same way the upload
+router does after streaming a file to disk.
+"""
+
+import hashlib
+import json
+import math
+from pathlib import Path
+
+from services import data_service
+
+
+def _load(tmp_path: Path, contents: bytes) -> data_service.DatasetState:
+    path = tmp_path / "upload.csv"
+    path.write_bytes(contents)
+    data_service.load_csv_file(path, hashlib.sha256(contents).hexdigest(), "upload.csv")
+    return data_service.get_state()
+
+
+# ---------------------------------------------------------------------------
+# CSVs pd.read_csv accepted before the move to Arrow's reader
+# ---------------------------------------------------------------------------
+
+def test_duplicate_headers_get_pandas_suffixes(tmp_path):
+    state = _load(tmp_path, b"a,a,revenue\n1,2,3\n4,5,6\n")
+    assert state.df.columns.tolist() == ["a", "a.1", "revenue"]
+    assert state.summary.numeric_columns == ["a", "a.1", "revenue"]
+
+
+def test_short_trailing_row_is_padded_with_missing_values(tmp_path):
+    state = _load(tmp_path, b"month,region,revenue\n2024-01,N,10\n2024-02,S\n")
+    assert state.summary.row_count == 2
+    assert state.df["revenue"].isna().tolist() == [False, True]
+
+
+def test_blank_header_is_named_unnamed(tmp_path):
+    state = _load(tmp_path, b",region,revenue\n1,N,10\n2,S,20\n")
+    assert state.df.columns.tolist() == ["Unnamed: 0", "region", "revenue"]
+
+
+# ---------------------------------------------------------------------------
+# Raw pages
+# ---------------------------------------------------------------------------
+
+def test_raw_page_floats_round_trip(tmp_path):
+    values = [1234.56, 143796.1313, 0.30000000000000004, 1e-07]
+    csv = "date,revenue\n" + "".join(f"2024-06-0{i + 1},{v!r}\n" for i, v in enumerate(values))
+    state = _load(tmp_path, csv.encode())
+
+    page = data_service.get_raw_data(state, page=1, page_size=10)
+    rows = json.loads(bytes(page.data))
+    assert [row["revenue"] for row in rows] == values
+    assert b'"revenue":1234.56}' in bytes(page.data)  # not 1234.559999...
+    # Day-resolution dates keep the CSV's own text (see _dates_as_text).
+    assert [row["date"] for row in rows] == ["2024-06-01", "2024-06-02", "2024-06-03", "2024-06-04"]
+
+
+# ---------------------------------------------------------------------------
+# Upload bookkeeping
+# ---------------------------------------------------------------------------
+
+def test_persisted_upload_is_not_owner_only(tmp_path):
+    tmp = tmp_path / "upload.part"
+    tmp.write_bytes(b"a\n1\n")
+    tmp.chmod(0o600)  # what NamedTemporaryFile creates
+    data_service.persist_upload(tmp, tmp_path, "kept.csv")
+    assert (tmp_path / "kept.csv").stat().st_mode & 0o777 == 0o644
+
+
+# ---------------------------------------------------------------------------
+# Charts
+# ---------------------------------------------------------------------------
+
+def test_failing_chart_is_served_empty_without_failing_the_load(tmp_path):
+    # Text revenue breaks every revenue sum; the funnel doesn't use it.
+    state = _load(
+        tmp_path,
+        b'month,revenue,customers,product_category\n'
+        b'2024-01,"$1,200",3,A\n2024-02,"$2,200",4,B\n',
+    )
+    assert state.charts["revenue-trend"] == []
+    assert state.charts["by-category"] == []
+    assert state.charts["conversion-funnel"] == [{"stage": "Customers", "value": 7}]
+    assert list(state.charts) == list(data_service.CHART_HANDLERS)
+
+
+def test_time_series_charts_share_the_monthly_sums(tmp_path):
+    state = _load(
+        tmp_path,
+        b"month,revenue,customers,marketing_spend\n"
+        b"2024-02,30,3,10\n2024-01,10,1,0\n2024-02,20,2,15\n",
+    )
+    assert state.charts["revenue-trend"] == [
+        {"month": "2024-01", "revenue": 10, "customers": 1},
+        {"month": "2024-02", "revenue": 50, "customers": 5},
+    ]
+    # A month with no spend has no ROI: NaN here, null once encoded.
+    roi = state.charts["marketing-roi"]
+    assert [row["month"] for row in roi] == ["2024-01", "2024-02"]
+    assert math.isnan(roi[0]["roi"]) and roi[1]["roi"] == 2.0